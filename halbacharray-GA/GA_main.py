@@ -1,4 +1,6 @@
 import os
+import array
+import contextlib
 import numpy as np
 import random
 from deap import base, tools, creator
@@ -8,28 +10,83 @@ import psutil
 import threading
 import config
 
-from field_calculations import fieldError, calculate_field_characteristics
+from field_calculations import fieldError, fieldError_batch, calculate_field_characteristics
 from documentation import save_dataframe_to_excel, save_duplicate_statistics,save_comprehensive_results, save_hof_and_logbook
 from pbs_monitor import get_current_job_id, monitor_pbs_resources
-from genetic_function import island_model
-from initialization import initialize_shared_data, generate_hallbach_rings, create_spherical_mask, extract_symmetric_ring_positions, compute_shim_fields
+from genetic_function import island_model, map_unique, map_unique_batch, cx_two_point_batch, mut_uniform_int_batch
+from initialization import initialize_shared_data, attach_shared_data, generate_hallbach_rings, create_spherical_mask, extract_symmetric_ring_positions, compute_shim_fields
 
 
 #-------------------------------LAMBDA FUNCTION DEFINITIONS--------------------------------------#
 
 
 # Replace lambda functions with named functions
-def generate_indices():
-    return random.randint(0, num_rings_perm - 1)
+
+# Generator for the initial genes, seeded from the random module on first use so that
+# seeding random makes the initial population reproducible, as in var_and_batch
+_rng = None
+
+def get_rng():
+    global _rng
+    if _rng is None:
+        _rng = np.random.default_rng(random.getrandbits(64))
+    return _rng
 
 def create_individual():
-    return creator.Individual([generate_indices() for _ in range(num_positions)])
+    genes = get_rng().integers(0, num_rings_perm, size=num_positions, dtype=np.dtype(creator.Individual.typecode))
+    return creator.Individual(genes.tobytes())
 
 def create_population(n):
-    return [create_individual() for _ in range(n)]
+    # Draw the genes of the whole population in a single call
+    block = get_rng().integers(0, num_rings_perm, size=(n, num_positions), dtype=np.dtype(creator.Individual.typecode))
+    return [creator.Individual(row.tobytes()) for row in block]
+
+# Shared memory descriptor of the shim fields, attached lazily once per process
+shared_data_spec = None
+shared_data = None
+_shared_shm = None
+
+def get_shared_data():
+    global shared_data, _shared_shm
+    if shared_data is None:
+        shared_data, _shared_shm = attach_shared_data(*shared_data_spec)
+    return shared_data
+
+def init_worker(spec):
+    # Attach the shared shim fields once when a pool worker starts
+    global shared_data_spec
+    shared_data_spec = spec
+    get_shared_data()
+
+# Per-process fitness cache, each pool worker gets its own copy on fork
+_fit_cache = {}
+_FIT_CACHE_SIZE = 200_000
 
 def evaluate(individual):
-    return fieldError(individual, shared_data)
+    key = individual.tobytes()
+    fitness = _fit_cache.get(key)
+    if fitness is None:
+        fitness = fieldError(individual, get_shared_data())
+        if len(_fit_cache) < _FIT_CACHE_SIZE:
+            _fit_cache[key] = fitness
+    return fitness
+
+def _evaluate_distinct(individuals):
+    # Cached individuals are looked up, the rest are evaluated together in a single call
+    keys = [individual.tobytes() for individual in individuals]
+    fitnesses = [_fit_cache.get(key) for key in keys]
+    missing = [i for i, fitness in enumerate(fitnesses) if fitness is None]
+    if missing:
+        errors = fieldError_batch([individuals[i] for i in missing], get_shared_data())
+        for i, error in zip(missing, errors):
+            fitnesses[i] = (float(error),)
+            if len(_fit_cache) < _FIT_CACHE_SIZE:
+                _fit_cache[keys[i]] = fitnesses[i]
+    return fitnesses
+
+def evaluate_batch(individuals):
+    # Evaluate a whole population, identical individuals are evaluated once
+    return map_unique_batch(_evaluate_distinct, individuals)
 
 
 #------------------------------------DEAP TOOLBOX SETUP-------------------------------------#
@@ -38,18 +95,23 @@ def setup_deap_toolbox(num_rings_perm, num_positions):
     """Sets up the DEAP toolbox for genetic algorithm operations."""
     try:
         creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
-        creator.create("Individual", list, fitness=creator.FitnessMin)
+        # Genes are ring indices, stored as unsigned 16 bit integers unless there are too many rings
+        typecode = 'H' if num_rings_perm <= 2**16 else 'I'
+        creator.create("Individual", array.array, typecode=typecode, fitness=creator.FitnessMin)
     except AttributeError:
         pass  # Already created
 
     toolbox = base.Toolbox()
-    toolbox.register("indices", generate_indices)
     toolbox.register("individual", create_individual)
     toolbox.register("population", create_population)
     toolbox.register("mate", tools.cxTwoPoint)
     toolbox.register("mutate", tools.mutUniformInt, low=0, up=num_rings_perm - 1, indpb=0.2)
+    toolbox.register("mate_batch", cx_two_point_batch)
+    toolbox.register("mutate_batch", mut_uniform_int_batch, low=0, up=num_rings_perm - 1, indpb=0.2)
     toolbox.register("select", tools.selTournament, tournsize=3)
     toolbox.register("evaluate", evaluate)
+    toolbox.register("map", map_unique)
+    toolbox.register("evaluate_batch", evaluate_batch)  # Used by ea_simple
 
     return toolbox
 
@@ -85,36 +147,47 @@ if __name__ == '__main__':
         config.magnetSize, config.resolution)
     
     # Share shim fields data (For multi node calculations)
-    shared_data = initialize_shared_data(shimFields)
+    shared_data, _shared_shm = initialize_shared_data(shimFields)
+    shared_data_spec = (_shared_shm.name, shared_data.shape, shared_data.dtype)
+    del shimFields  # The shared memory block now holds the only copy
 
-    # Set up DEAP toolbox
-    toolbox = setup_deap_toolbox(num_rings_perm, num_positions)
+    # Always release the shared memory block holding the shim fields, also when the GA fails
+    try:
+        # Set up DEAP toolbox
+        toolbox = setup_deap_toolbox(num_rings_perm, num_positions)
 
-    # Start memory monitoring in a separate thread
-    memory_log_file = os.path.join(results_folder, "memory_usage.csv")
-    memory_monitor_thread = threading.Thread(target=monitor_pbs_resources, args=(job_id, 600, memory_log_file))
-    memory_monitor_thread.daemon = True  # Allows the thread to close with the main program
-    memory_monitor_thread.start()
+        # Start memory monitoring in a separate thread
+        memory_log_file = os.path.join(results_folder, "memory_usage.csv")
+        memory_monitor_thread = threading.Thread(target=monitor_pbs_resources, args=(job_id, 600, memory_log_file))
+        memory_monitor_thread.daemon = True  # Allows the thread to close with the main program
+        memory_monitor_thread.start()
 
-    excel_file_path = save_dataframe_to_excel(df, results_folder, config.InnerBoreDiameter, config.OuterBoreDiameter, config.magnetSize)
+        excel_file_path = save_dataframe_to_excel(df, results_folder, config.InnerBoreDiameter, config.OuterBoreDiameter, config.magnetSize)
 
-    # Run Island Model GA with duplicate tracking
-    start_time = time.time()
+        # Run Island Model GA with duplicate tracking
+        start_time = time.time()
 
-    final_pops, logs, hof, duplicate_stats = island_model(
-        toolbox, config.CXPB, config.MUTPB, config.NGEN, config.num_islands, config.NGEN, 
-        config.migration_interval, config.popSim, config.selected_algorithm)
+        final_pops, logs, hof, duplicate_stats = island_model(
+            toolbox, config.CXPB, config.MUTPB, config.NGEN, config.num_islands, config.NGEN, 
+            config.migration_interval, config.popSim, config.selected_algorithm,
+            initializer=init_worker, initargs=(shared_data_spec,))
 
-    end_time = time.time()
+        end_time = time.time()
 
 
-    # Save duplicate statistics
-    duplicate_file = save_duplicate_statistics(duplicate_stats, results_folder)
+        # Save duplicate statistics
+        duplicate_file = save_duplicate_statistics(duplicate_stats, results_folder)
 
 
-    # Calculate field characteristics for the best individual
-    best_individual = hof[0]
-    mean_field, homogeneity = calculate_field_characteristics(best_individual, shared_data)
+        # Calculate field characteristics for the best individual
+        best_individual = hof[0]
+        mean_field, homogeneity = calculate_field_characteristics(best_individual, shared_data)
+    finally:
+        # Unlink first so the segment is removed even if a traceback frame still holds a view of it
+        shared_data = None
+        _shared_shm.unlink()
+        with contextlib.suppress(BufferError):
+            _shared_shm.close()
     
     # Calculate total execution time
     total_end_time = time.time()
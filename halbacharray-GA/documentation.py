@@ -14,36 +14,35 @@ def save_dataframe_to_excel(df, output_folder, InnerBoreDiameter, OuterBoreDiame
     df (pandas.DataFrame): The DataFrame containing the Hallbach ring parameters
     output_folder (str): Folder path to save the Excel file
     """
-    # Create a list to store the expanded data
-    expanded_data = []
-    
-    # Iterate through the DataFrame and create detailed entries
-    for index, row in df.iterrows():
-        # Convert the arrays to lists if they aren't already
-        band_radius = row['BandRadius'].tolist() if isinstance(row['BandRadius'], np.ndarray) else row['BandRadius']
-        magnet_nr = row['MagnetNr'].tolist() if isinstance(row['MagnetNr'], np.ndarray) else row['MagnetNr']
-        
-        entry = {
-            'Configuration_Number': index,
-            'Band_Number': row['BandNumber'],
-            'Band_Radii_Gap_mm': row['BandRadiiGap'] * 1000,  # Convert to mm
-            'Magnet_Space_mm': row['MagnetSpace'] * 1000,     # Convert to mm
-            'Band_Separation_mm': row['BandSeparation'] * 1000 # Convert to mm
-        }
-        
-        # Add band radius and magnet number for each band
-        for i in range(len(band_radius)):
-            entry[f'Band_{i+1}_Radius_mm'] = band_radius[i] * 1000  # Convert to mm
-            entry[f'Band_{i+1}_Magnet_Count'] = magnet_nr[i]
-        
-        expanded_data.append(entry)
-    
-    # Convert to DataFrame
-    detailed_df = pd.DataFrame(expanded_data)
+    band_number = df['BandNumber'].to_numpy()
+    num_bands = int(band_number.max()) if len(df) else 0
+
+    # Pad the ragged per-band arrays into (configuration, band) matrices, one stack per band count
+    band_radius = np.full((len(df), num_bands), np.nan)
+    magnet_nr = np.full((len(df), num_bands), np.nan)
+    for bands in np.unique(band_number):
+        rows = band_number == bands
+        band_radius[rows, :bands] = np.stack(df['BandRadius'].to_numpy()[rows])
+        magnet_nr[rows, :bands] = np.stack(df['MagnetNr'].to_numpy()[rows])
+
+    columns = {
+        'Configuration_Number': df.index.to_numpy(),
+        'Band_Number': band_number,
+        'Band_Radii_Gap_mm': df['BandRadiiGap'].to_numpy() * 1000,  # Convert to mm
+        'Magnet_Space_mm': df['MagnetSpace'].to_numpy() * 1000,     # Convert to mm
+        'Band_Separation_mm': df['BandSeparation'].to_numpy() * 1000 # Convert to mm
+    }
+
+    # Add band radius and magnet number for each band
+    for i in range(num_bands):
+        columns[f'Band_{i+1}_Radius_mm'] = band_radius[:, i] * 1000  # Convert to mm
+        columns[f'Band_{i+1}_Magnet_Count'] = magnet_nr[:, i]
+
+    detailed_df = pd.DataFrame(columns)
     
     # Create Excel writer object
     excel_path = os.path.join(output_folder, 'hallbach_configurations.xlsx')
-    with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
+    with pd.ExcelWriter(excel_path, engine='xlsxwriter') as writer:
         # Write the main data
         detailed_df.to_excel(writer, sheet_name='Configurations', index=False)
         
@@ -102,9 +101,10 @@ def save_hof_and_logbook(hof, logs, results_folder):
     hof_file = os.path.join(results_folder, "hof_individuals.csv")
     logbook_file = os.path.join(results_folder, "logbook.csv")
     
+    # Build all lines in memory and write them in one call
+    lines = [",".join(map(str, ind)) + "," + str(ind.fitness.values[0]) + "\n" for ind in hof]
     with open(hof_file, "w") as hof_file_obj:
-        for ind in hof:
-            hof_file_obj.write(",".join(map(str, ind)) + "," + str(ind.fitness.values[0]) + "\n")
+        hof_file_obj.writelines(lines)
     
     logs.to_csv(logbook_file, index=False)
     return hof_file, logbook_file
\ No newline at end of file
@@ -4,15 +4,59 @@
 """
 
 import numpy as np
+from numba import njit
 import config
 
+@njit(fastmath=True, cache=True)
+def _stats(field):
+    # Minimum, maximum and sum of the field in a single pass
+    mn = field[0]
+    mx = field[0]
+    s = 0.0
+    for i in range(field.size):
+        v = field[i]
+        if v < mn:
+            mn = v
+        if v > mx:
+            mx = v
+        s += v
+    return mn, mx, s
+
+@njit(fastmath=True, cache=True)
+def _field_error_kernel(shared_data, shimVector, T_target, homogeneity_weight, field_strength_weight):
+    # Add the contiguous field vector of the selected shim at every position, without NumPy temporaries.
+    # The float32 shim fields are accumulated in float64 so the ppm error terms are computed at full precision.
+    num_shims = shimVector.shape[0]
+    num_points = shared_data.shape[2]
+    field = np.zeros(num_points)
+    for j in range(num_shims):
+        k = shimVector[j]
+        for i in range(num_points):
+            field[i] += shared_data[j, k, i]
+
+    mn, mx, s = _stats(field)
+    mean_field_strength = s / num_points
+    homogeneity_error = ((mx - mn) / mean_field_strength) * 1e6
+    field_strength_error = abs(mean_field_strength - T_target) * 1e6
+
+    return (homogeneity_weight * homogeneity_error) + (field_strength_weight * field_strength_error)
+
+@njit(fastmath=True, cache=True)
+def _field_error_batch_kernel(shared_data, shimMatrix, T_target, homogeneity_weight, field_strength_weight):
+    # Evaluate every row of the shim matrix in compiled code, one call for the whole batch
+    errors = np.empty(shimMatrix.shape[0])
+    for p in range(shimMatrix.shape[0]):
+        errors[p] = _field_error_kernel(shared_data, shimMatrix[p], T_target, homogeneity_weight, field_strength_weight)
+    return errors
+
 def fieldError(shimVector, shared_data):
     """
     Calculate the homogeneity and field strength error values for a given shim configuration.
 
     Parameters:
     - shimVector (array-like): The indices representing the chosen shim configuration.
-    - shared_data (numpy array): A 3D array containing precomputed field data.
+    - shared_data (numpy array): A 3D array containing precomputed field data, shaped (positions, sizes, points).
+      Stored as float32 (about 7 significant digits), the field is summed in float64.
     - T_target (float, optional): The target field strength (default: 0.05).
     - homogeneity_weight (float, optional): The weight given to homogeneity error (default: 0.85).
     - field_strength_weight (float, optional): The weight given to field strength error (default: 0.15).
@@ -21,22 +65,25 @@ def fieldError(shimVector, shared_data):
     - tuple: A single-value tuple containing the total error score, which combines homogeneity 
       and field strength errors based on the given weights.
     """
-    field = np.zeros(np.size(shared_data, 0))
-
-    for idx1 in range(np.size(shimVector)):
-        field += shared_data[:, idx1, shimVector[idx1]]
+    # Combine the homogeneity and field strength errors into a single fitness score, prioritizing according to weighting
+    total_error = _field_error_kernel(shared_data, np.asarray(shimVector, dtype=np.int64), config.T_target,
+                                      config.homogeneity_weight, config.field_strength_weight)
 
-    # Homogeneity error
-    homogeneity_error = ((np.max(field) - np.min(field)) / np.mean(field)) * 1e6
+    return (total_error,)
 
-    # Field strength error
-    mean_field_strength = np.mean(field)
-    field_strength_error = np.abs(mean_field_strength - config.T_target) * 1e6
+def fieldError_batch(shimMatrix, shared_data):
+    """
+    Calculate the total error score of many shim configurations at once, see fieldError.
 
-    # Combine the two errors into a single fitness score, prioritizing according to weighting
-    total_error = (config.homogeneity_weight * homogeneity_error) + (config.field_strength_weight * field_strength_error)
+    Parameters:
+    - shimMatrix (array-like): (P, L) indices, one shim configuration per row.
+    - shared_data (numpy array): A 3D array containing precomputed field data, shaped (positions, sizes, points).
 
-    return (total_error,)
+    Returns:
+    - numpy.ndarray: The P total error scores.
+    """
+    return _field_error_batch_kernel(shared_data, np.asarray(shimMatrix, dtype=np.int64), config.T_target,
+                                     config.homogeneity_weight, config.field_strength_weight)
 
 def calculate_field_characteristics(individual, shared_data):
     """
@@ -46,13 +93,11 @@ def calculate_field_characteristics(individual, shared_data):
     - mean_field: Average field strength
     - homogeneity: Field homogeneity in ppm
     """
-    field = np.zeros(np.size(shared_data, 0))
-    
-    for idx1 in range(np.size(individual)):
-        field += shared_data[:, idx1, individual[idx1]]
+    individual = np.asarray(individual, dtype=np.intp)
+    field = shared_data[np.arange(individual.size), individual, :].sum(axis=0, dtype=np.float64)
     
-    mean_field = np.mean(field)
-    homogeneity = ((np.max(field) - np.min(field)) / mean_field) * 1e6  # in ppm
+    mean_field = field.mean()
+    homogeneity = (np.ptp(field) / mean_field) * 1e6  # in ppm
     
     return mean_field, homogeneity
 
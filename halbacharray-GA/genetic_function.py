@@ -1,23 +1,22 @@
 import numpy as np
+import random
 from deap import algorithms, tools
 import pandas as pd
 import multiprocessing
-from collections import Counter
+import os
 
 def count_duplicates(population):
     """
     Count how many duplicate individuals exist in the population
     Returns both the count and percentage of duplicates
     """
-    # Convert individuals to tuples for hashability
-    tuple_population = [tuple(ind) for ind in population]
-    
-    counts = Counter(tuple_population)
+    # Stack individuals into a 2-D array and count unique rows in one sort
+    _, counts = np.unique(np.asarray(population), axis=0, return_counts=True)
     
     # Calculate duplicates
-    duplicates = sum(count - 1 for count in counts.values() if count > 1)
-    unique_individuals = len(counts)
+    unique_individuals = counts.size
     total_population = len(population)
+    duplicates = int(total_population - unique_individuals)
     duplicate_percentage = (duplicates / total_population) * 100
     
     return {
@@ -27,19 +26,57 @@ def count_duplicates(population):
         'duplicate_percentage': duplicate_percentage
     }
 
+def _unique_rows(individuals):
+    # Distinct individuals in order of first appearance, and the index of each input among them
+    _, first_idx, inverse = np.unique(np.asarray(individuals), axis=0, return_index=True, return_inverse=True)
+    return [individuals[i] for i in first_idx], inverse.ravel()
+
+def map_unique(func, individuals):
+    """
+    Drop-in replacement for map used by the DEAP algorithms to evaluate a population.
+    Identical individuals are evaluated once and their result is shared with every copy.
+    """
+    individuals = list(individuals)
+    if not individuals:
+        return []
+
+    unique_individuals, inverse = _unique_rows(individuals)
+    results = [func(ind) for ind in unique_individuals]
+    return [results[i] for i in inverse]
+
+def map_unique_batch(batch, individuals):
+    """
+    Like map_unique, but batch is called once with the list of distinct individuals and
+    must return their results in the same order.
+    """
+    individuals = list(individuals)
+    if not individuals:
+        return []
+
+    unique_individuals, inverse = _unique_rows(individuals)
+    results = batch(unique_individuals)
+    return [results[i] for i in inverse]
+
 def migrate_island(populations, migration_rate=0.3):
-    """Migrate individuals between islands."""
+    """
+    Migrate individuals between islands using a ring topology.
+
+    Emigrants are the best individuals of every island, selected before any island is
+    modified. On each island the num_migrate worst positions are removed and the best of
+    its predecessor appended, so island sizes stay constant as with tools.migRing.
+    Positions are removed in one pass per island instead of migRing's per-individual
+    list.index lookup, so migrants end up at the end of the island rather than in the
+    replaced slots.
+    """
     num_migrate = int(migration_rate * len(populations[0]))  # Number of individuals to migrate
+    emigrants = [tools.selBest(pop, num_migrate) for pop in populations]
 
-    for i in range(len(populations)):
-        source_island = populations[i]
+    for i, migrants in enumerate(emigrants):
         target_island = populations[(i + 1) % len(populations)]
-        migrants = tools.selBest(source_island, num_migrate)
-        immigrants = tools.selWorst(target_island, num_migrate)
-
-        for j in range(num_migrate):
-            target_island.remove(immigrants[j])
-            target_island.append(migrants[j])
+        # Remove by position, a population can hold the same individual object more than once
+        worst = set(sorted(range(len(target_island)), key=lambda j: target_island[j].fitness)[:num_migrate])
+        target_island[:] = [ind for j, ind in enumerate(target_island) if j not in worst]
+        target_island.extend(migrants)
 
     return populations
 
@@ -54,7 +91,127 @@ def create_stats():
     stats.register("max", np.max)
     return stats
 
-def evolve_island(algorithm_type, pop, toolbox, cxpb, mutpb, ngen):
+def cx_two_point_batch(genes, cxpb, rng):
+    """
+    Vectorized tools.cxTwoPoint over a (N, L) gene matrix, applied in place.
+    Consecutive rows (0, 1), (2, 3), ... are mated with probability cxpb.
+
+    Returns:
+        numpy.ndarray: Boolean mask of the rows that were crossed over.
+    """
+    n, size = genes.shape
+    crossed = np.zeros(n, dtype=bool)
+    first = 2 * np.flatnonzero(rng.random(n // 2) < cxpb)
+    second = first + 1
+
+    # Two distinct cut points in [1, size], drawn the same way as cxTwoPoint
+    cxpoint1 = rng.integers(1, size + 1, size=first.size)
+    cxpoint2 = rng.integers(1, size, size=first.size)
+    cxpoint2 += cxpoint2 >= cxpoint1
+    low = np.minimum(cxpoint1, cxpoint2)
+    high = np.maximum(cxpoint1, cxpoint2)
+
+    # Swap the genes between the cut points of every selected pair at once
+    columns = np.arange(size)
+    segment = (columns >= low[:, None]) & (columns < high[:, None])
+    genes_first, genes_second = genes[first], genes[second]
+    genes[first] = np.where(segment, genes_second, genes_first)
+    genes[second] = np.where(segment, genes_first, genes_second)
+
+    crossed[first] = True
+    crossed[second] = True
+    return crossed
+
+def mut_uniform_int_batch(genes, mutpb, rng, low, up, indpb):
+    """
+    Vectorized tools.mutUniformInt over a (N, L) gene matrix, applied in place.
+    Each row is mutated with probability mutpb, each of its genes is then redrawn
+    in [low, up] with probability indpb.
+
+    Returns:
+        numpy.ndarray: Boolean mask of the rows that were mutated.
+    """
+    mutated = rng.random(genes.shape[0]) < mutpb
+    mask = (rng.random(genes.shape) < indpb) & mutated[:, None]
+    genes[mask] = rng.integers(low, up + 1, size=int(mask.sum()), dtype=genes.dtype)
+    return mutated
+
+def var_and_batch(offspring, toolbox, cxpb, mutpb):
+    """
+    Vectorized algorithms.varAnd using toolbox.mate_batch and toolbox.mutate_batch on the
+    gene matrix of the offspring. Fresh individuals are built from the varied rows, only
+    the modified ones lose their fitness.
+    """
+    rng = np.random.default_rng(random.getrandbits(64))
+    # Keep the individuals' typecode so the varied rows can be turned back into individuals as raw bytes
+    genes = np.array(offspring, dtype=np.dtype(offspring[0].typecode))
+
+    changed = toolbox.mate_batch(genes, cxpb, rng)
+    changed |= toolbox.mutate_batch(genes, mutpb, rng)
+
+    new_offspring = []
+    for ind, row, modified in zip(offspring, genes, changed):
+        child = type(ind)(row.tobytes())
+        if not modified and ind.fitness.valid:
+            child.fitness.values = ind.fitness.values
+        new_offspring.append(child)
+
+    return new_offspring
+
+def ea_simple(population, toolbox, cxpb, mutpb, ngen, stats=None, halloffame=None, verbose=__debug__,
+              on_generation=None):
+    """
+    Copy of deap.algorithms.eaSimple that calls on_generation(population, gen) after each
+    generation, giving access to the intermediate populations eaSimple otherwise hides.
+    Variation is done on the whole offspring at once by var_and_batch, and the individuals
+    with an invalid fitness are evaluated together by toolbox.evaluate_batch.
+    """
+    logbook = tools.Logbook()
+    logbook.header = ['gen', 'nevals'] + (stats.fields if stats else [])
+
+    # Evaluate the individuals with an invalid fitness
+    invalid_ind = [ind for ind in population if not ind.fitness.valid]
+    fitnesses = toolbox.evaluate_batch(invalid_ind)
+    for ind, fit in zip(invalid_ind, fitnesses):
+        ind.fitness.values = fit
+
+    if halloffame is not None:
+        halloffame.update(population)
+
+    record = stats.compile(population) if stats else {}
+    logbook.record(gen=0, nevals=len(invalid_ind), **record)
+    if verbose:
+        print(logbook.stream)
+
+    # Begin the generational process
+    for gen in range(1, ngen + 1):
+        # Select and vary the next generation individuals
+        offspring = toolbox.select(population, len(population))
+        offspring = var_and_batch(offspring, toolbox, cxpb, mutpb)
+
+        # Evaluate the individuals with an invalid fitness
+        invalid_ind = [ind for ind in offspring if not ind.fitness.valid]
+        fitnesses = toolbox.evaluate_batch(invalid_ind)
+        for ind, fit in zip(invalid_ind, fitnesses):
+            ind.fitness.values = fit
+
+        if halloffame is not None:
+            halloffame.update(offspring)
+
+        # Replace the current population by the offspring
+        population[:] = offspring
+
+        record = stats.compile(population) if stats else {}
+        logbook.record(gen=gen, nevals=len(invalid_ind), **record)
+        if verbose:
+            print(logbook.stream)
+
+        if on_generation is not None:
+            on_generation(population, gen)
+
+    return population, logbook
+
+def evolve_island(algorithm_type, pop, toolbox, cxpb, mutpb, ngen, dup_every=10):
     """
     Runs a selected evolutionary algorithm on a population for a given number of generations.
     
@@ -68,9 +225,11 @@ def evolve_island(algorithm_type, pop, toolbox, cxpb, mutpb, ngen):
         cxpb (float): Crossover probability.
         mutpb (float): Mutation probability.
         ngen (int): Number of generations to run the evolution.
+        dup_every (int): Interval in generations at which duplicates are counted ('eaSimple' only,
+            the other algorithms are sampled at the first and last generation).
 
     Returns:
-        tuple: (final population, logbook of statistics, duplicate tracking data)
+        tuple: (final population, logbook of statistics, duplicate tracking data, best individual found)
     """
     stats = create_stats()
     hof = tools.HallOfFame(1)
@@ -86,9 +245,13 @@ def evolve_island(algorithm_type, pop, toolbox, cxpb, mutpb, ngen):
     # Collect initial stats
     collect_stats(pop, 0)
     
+    def sample_stats(pop, gen):
+        if gen % dup_every == 0 or gen == ngen:
+            collect_stats(pop, gen)
+    
     if algorithm_type == "eaSimple":
-        pop, log = algorithms.eaSimple(pop, toolbox, cxpb=cxpb, mutpb=mutpb, ngen=ngen, 
-                                     stats=stats, halloffame=hof, verbose=True)
+        pop, log = ea_simple(pop, toolbox, cxpb=cxpb, mutpb=mutpb, ngen=ngen, 
+                             stats=stats, halloffame=hof, verbose=True, on_generation=sample_stats)
     elif algorithm_type == "eaMuPlusLambda":
         pop, log = algorithms.eaMuPlusLambda(pop, toolbox, mu=5000, lambda_=3000, 
                                            cxpb=cxpb, mutpb=mutpb, ngen=ngen, 
@@ -100,21 +263,24 @@ def evolve_island(algorithm_type, pop, toolbox, cxpb, mutpb, ngen):
     else:
         raise ValueError(f"Algorithm type '{algorithm_type}' not recognized")
     
-    # Collect final stats
-    collect_stats(pop, ngen)
+    # Collect final stats, eaSimple already sampled the last generation
+    if algorithm_type != "eaSimple":
+        collect_stats(pop, ngen)
     
-    return pop, log, duplicate_stats
+    return pop, log, duplicate_stats, hof[0]
 
 def evolve_island_wrapper(args):
     """
     Wrapper function for evolve_island to enable parallel execution with multiprocessing.
-    Unpacks arguments and calls evolve_island, returning population, log, and duplicate statistics.
+    Unpacks arguments and calls evolve_island, returning population, log, duplicate statistics
+    and the island champion.
     """ 
     algorithm_type, pop, toolbox, cxpb, mutpb, ngen = args
-    pop, log, duplicate_stats = evolve_island(algorithm_type, pop, toolbox, cxpb, mutpb, ngen)
-    return pop, log, duplicate_stats
+    pop, log, duplicate_stats, champion = evolve_island(algorithm_type, pop, toolbox, cxpb, mutpb, ngen)
+    return pop, log, duplicate_stats, champion
 
-def island_model(toolbox, cxpb, mutpb, ngen, num_islands, num_generations, migration_interval, popSim, selected_algorithm):
+def island_model(toolbox, cxpb, mutpb, ngen, num_islands, num_generations, migration_interval, popSim, selected_algorithm,
+                 initializer=None, initargs=()):
     """
     Runs a parallelized island model with genetic algorithms, evolving populations across multiple islands.
     
@@ -132,6 +298,8 @@ def island_model(toolbox, cxpb, mutpb, ngen, num_islands, num_generations, migra
         migration_interval (int): Interval at which individuals are migrated between islands.
         popSim (int): Population size.
         selected_algorithm (str): The evolutionary algorithm to use ('eaSimple', 'eaMuPlusLambda', or 'eaMuCommaLambda').
+        initializer (callable, optional): Called with initargs once in every worker process on start-up.
+        initargs (tuple, optional): Arguments passed to initializer.
 
     Returns:
         tuple: (final populations, combined logbook of statistics, Hall of Fame with the best individual, 
@@ -141,26 +309,41 @@ def island_model(toolbox, cxpb, mutpb, ngen, num_islands, num_generations, migra
     logs = []
     all_duplicate_stats = []
     hof = tools.HallOfFame(1)
+    global_best = None
 
-    for gen in range(0, num_generations, migration_interval):
-        with multiprocessing.Pool(processes=num_islands) as pool:
-            args = [(selected_algorithm, pop, toolbox, cxpb, mutpb, migration_interval) 
+    # Workers are created once and reused across migration epochs, never more than the cores this process
+    # may run on (under PBS the job's ncpus, not every core of the node). Islands outnumbering the workers
+    # are queued. Workers are recycled periodically to reclaim memory. Leaving the block terminates the
+    # pool, so workers are stopped at once if an island fails.
+    processes = min(num_islands, len(os.sched_getaffinity(0)))
+    with multiprocessing.Pool(processes=processes, maxtasksperchild=50,
+                              initializer=initializer, initargs=initargs) as pool:
+        for gen in range(0, num_generations, migration_interval):
+            args = [(selected_algorithm, pop, toolbox, cxpb, mutpb, migration_interval)
                    for pop in populations]
-            results = pool.map(evolve_island_wrapper, args)
+            results = list(pool.imap(evolve_island_wrapper, args, chunksize=1))
+
+            populations = [pop for pop, _, _, _ in results]
+            logs.extend([log for _, log, _, _ in results])
+            all_duplicate_stats.extend([stats for _, _, stats, _ in results])
+
+            # Keep the best champion seen over all epochs
+            for _, _, _, champion in results:
+                if global_best is None or get_fitness(champion) < get_fitness(global_best):
+                    global_best = champion
+
+            # Track duplicates after migration
+            populations = migrate_island(populations)
 
-        populations = [pop for pop, _, _ in results]
-        logs.extend([log for _, log, _ in results])
-        all_duplicate_stats.extend([stats for _, _, stats in results])
-        
-        # Track duplicates after migration
-        populations = migrate_island(populations)
+        pool.close()
+        pool.join()
 
-    # Combine logs from all islands
-    combined_log = pd.concat([pd.DataFrame(log) for log in logs])
+    # Combine logs from all islands, logbooks are lists of dicts so build a single DataFrame
+    rows = []
+    for log in logs:
+        rows.extend(log)
+    combined_log = pd.DataFrame(rows)
     
-    # Find the best individual across all islands
-    best_individuals = [tools.selBest(pop, 1)[0] for pop in populations]
-    best_individual = min(best_individuals, key=lambda ind: ind.fitness.values)
-    hof.update([best_individual])
+    hof.update([global_best])
 
     return populations, combined_log, hof, all_duplicate_stats
\ No newline at end of file
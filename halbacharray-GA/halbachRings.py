@@ -1,8 +1,22 @@
-import matplotlib.pyplot as plt
 import numpy as np
+import math
+from functools import lru_cache
 
 # Work in mm and use radii
 
+@lru_cache(maxsize=None)
+def _magnet_radius(magnetSize):
+    # Effective radius of a square magnet, slightly larger than the magnet itself
+    return round(math.sqrt(((magnetSize**2)/2)), 6)
+
+def _max_magnet_number(magnetRadius, magnetRingRadius, magnetSpace):
+    # Number of magnets of the given radius and spacing that fit around a ring
+    return round(math.pi/math.asin((magnetRadius + (magnetSpace/2))/magnetRingRadius))
+
+def _magnet_positions(magnetNumber):
+    # Angular positions of magnets evenly distributed around a circle
+    return np.linspace(0, 2*np.pi, round(magnetNumber), endpoint = False)
+
 class HallbachRing:
     def __init__(self, magnetSize=0.012, boreRadius=0.100, magnetRingRadii=[-1]*3, magnetsInRingNr=[-1]*3, bandGap = 0, magnetSpace = 0, bandSep = 0):
 
@@ -22,20 +36,25 @@ class HallbachRing:
         """
 
         self.magnetSize = magnetSize
-        self.magnetRadius = self.calculateMagnetRadius(magnetSize)
+        self.magnetRadius = _magnet_radius(magnetSize)
+        self.magnetDiameter = self.magnetRadius*2
         self.boreRadius = boreRadius
         self.bandGap = bandGap
         self.magnetSpace = magnetSpace
-        self.magnetRing = []
         self.bandSep = bandSep
 
+        # Ring data is kept as parallel arrays, one entry per ring
+        self.ringRadii = np.empty(len(magnetRingRadii))
+        self.magnetsInRingNrs = np.empty(len(magnetRingRadii), dtype=np.int32)
+
         for index, magnetRingRadius in enumerate(magnetRingRadii):
-            self.magnetRing.append(self.createMagnetRing(index, magnetRingRadius, magnetsInRingNr[index], self.bandGap, self.bandSep))
+            self.ringRadii[index], self.magnetsInRingNrs[index] = self.createMagnetRing(
+                index, magnetRingRadius, magnetsInRingNr[index], self.bandGap, self.bandSep)
 
         return None
     
-    @classmethod
-    def calculateMagnetRadius(self, magnetSize):
+    @staticmethod
+    def calculateMagnetRadius(magnetSize):
         """
         Calculates the effective radius of a square magnet.
 
@@ -46,7 +65,7 @@ class HallbachRing:
         - float: The calculated radius of the magnet.
         """
         # Note here radii are slightly larger than magnet.
-        return round(np.sqrt(((magnetSize**2)/2)), 6)
+        return _magnet_radius(magnetSize)
 
     def calculateMaxMagnetNumber(self, magnetRadius, magnetRingRadius, magnetSpace):
         """
@@ -60,7 +79,7 @@ class HallbachRing:
         Returns:
         - int: The maximum number of magnets that can fit in the ring.
         """
-        return round(np.pi/np.arcsin((self.magnetRadius + (magnetSpace/2))/magnetRingRadius))
+        return _max_magnet_number(self.magnetRadius, magnetRingRadius, magnetSpace)
 
     def calculateMagnetPositions(self, magnetNumber):
         """
@@ -74,11 +93,11 @@ class HallbachRing:
         """
         # Returns magnet positions in radius distributed around a circle
         # If you use a max value, it might need to be rounded.
-        return np.linspace(0, 2*np.pi, round(magnetNumber), endpoint = False)
+        return _magnet_positions(magnetNumber)
 
     def createMagnetRing(self, index, magnetRingRadius, magnetsInRingNr, bandGap, bandSep):
         """
-        Creates a dictionary representing a single magnet ring with valid parameters.
+        Validates a single magnet ring and resolves its radius and magnet count.
 
         Parameters:
         - index (int): The index of the ring (starting from 0).
@@ -88,7 +107,7 @@ class HallbachRing:
         - bandSep (float): The separation distance from the bore to the first ring.
 
         Returns:
-        - dict: A dictionary containing the ring radius and the number of magnets in the ring.
+        - tuple: (ring radius, number of magnets in the ring).
 
         Raises:
         - ValueError: If the provided ring radius is too small or if the requested number of magnets exceeds the maximum capacity.
@@ -98,7 +117,7 @@ class HallbachRing:
         if(index == 0):
             minimumRadius = self.boreRadius + self.magnetRadius + bandSep
         else:
-            minimumRadius = self.magnetRing[index -1]['ringRadius']+self.magnetRadius*2 + bandGap
+            minimumRadius = self.ringRadii[index -1]+self.magnetDiameter + bandGap
 
         # Assign minimum radius if not specified
         if(magnetRingRadius == -1):
@@ -122,12 +141,7 @@ class HallbachRing:
             raise ValueError("magnetRing %d: Can not fit %d magnets in a radius of %.3fmm. Max is %d"
                              % (index, magnetsInRingNr, magnetRingRadius, maxRingMagnetNr))
 
-        aMagnetRing = {
-
-            "ringRadius": magnetRingRadius,
-            "magnetsInRingNr": magnetsInRingNr}
-
-        return aMagnetRing
+        return magnetRingRadius, magnetsInRingNr
 
 
     def getParameters(self):
@@ -135,14 +149,6 @@ class HallbachRing:
         Retrieves the radii and magnet counts for all rings.
 
         Returns:
-        - tuple: (numpy array of ring radii, numpy array of magnets per ring).
+        - tuple: (numpy array of ring radii, numpy array of magnets per ring). The arrays are not copied.
         """
-        ringRadii = np.empty(len(self.magnetRing))
-        magnetsInRingNrs = np.empty(len(self.magnetRing))
-
-        for i in range(len(self.magnetRing)):
-            ringRadii[i] = self.magnetRing[i]['ringRadius']
-            magnetsInRingNrs[i] = self.magnetRing[i]['magnetsInRingNr']
-
-        return ringRadii, magnetsInRingNrs
-
+        return self.ringRadii, self.magnetsInRingNrs
@@ -2,9 +2,10 @@
 @author: tmachtelinckx
 """
 
+import os
 import numpy as np
-import ctypes
 import multiprocessing
+from multiprocessing import shared_memory
 import pandas as pd
 import config 
 import halbachFields
@@ -36,8 +37,15 @@ def generate_hallbach_rings(magnetSize, InnerBoreDiameter, OuterBoreDiameter, am
     # Determine maximum radius at which magnets can be placed (upper threshold)
     bandRadiusThreshold = (OuterBoreDiameter / 2) - magnetSize
 
-    # Initialize lists to store data
-    data = []
+    # Preallocate the columns for the worst case where every combination is valid
+    numCombinations = len(amountBand) * len(bandRadiiGap) * len(bandSep) * len(magnetSpace)
+    band_number = np.empty(numCombinations, dtype=np.asarray(amountBand).dtype)
+    radii_gap = np.empty(numCombinations)
+    magnet_space = np.empty(numCombinations)
+    band_separation = np.empty(numCombinations)
+    band_radius = np.empty(numCombinations, dtype=object)  # Ragged, one array per configuration
+    magnet_nr = np.empty(numCombinations, dtype=object)
+    n = 0
 
     # Iterate over combinations of amountBand, bandRadiiGap, and magnetSpace
     for i in range(len(amountBand)):
@@ -60,19 +68,25 @@ def generate_hallbach_rings(magnetSize, InnerBoreDiameter, OuterBoreDiameter, am
                     )
                     bandRadius, bandMagnetNr = singleHallbachRing.getParameters()
 
-                    if any(r > bandRadiusThreshold for r in bandRadius):
+                    if (bandRadius > bandRadiusThreshold).any():
                         continue
 
-                    data.append({
-                        'BandNumber': amountBand[i],
-                        'BandRadiiGap': bandRadiiGap[j],
-                        'MagnetSpace': magnetSpace[k],
-                        'BandSeparation': bandSep[l],
-                        'BandRadius': bandRadius,
-                        'MagnetNr': bandMagnetNr
-                    })
-
-    df = pd.DataFrame(data)
+                    band_number[n] = amountBand[i]
+                    radii_gap[n] = bandRadiiGap[j]
+                    magnet_space[n] = magnetSpace[k]
+                    band_separation[n] = bandSep[l]
+                    band_radius[n] = bandRadius
+                    magnet_nr[n] = bandMagnetNr
+                    n += 1
+
+    df = pd.DataFrame({
+        'BandNumber': band_number[:n],
+        'BandRadiiGap': radii_gap[:n],
+        'MagnetSpace': magnet_space[:n],
+        'BandSeparation': band_separation[:n],
+        'BandRadius': band_radius[:n],
+        'MagnetNr': magnet_nr[:n]
+    })
 
     # Track the number of rings and the length of df
     num_rings_perm = len(df)
@@ -88,21 +102,23 @@ def create_spherical_mask(DSV, resolution):
     - resolution (float): The spatial resolution of the simulation grid.
 
     Returns:
-    - mask (numpy.ndarray): A binary mask where 1 indicates points inside the sphere.
-    - octantMask (numpy.ndarray): A mask of the first octant of the sphere for symmetry reduction.
+    - mask (numpy.ndarray): A boolean mask where True indicates points inside the sphere.
+    - octantMask (numpy.ndarray): A boolean mask of the first octant of the sphere for symmetry reduction.
     """
     
     coordinateAxis = np.linspace(-config.simDimensions[0] / 2, config.simDimensions[0] / 2, int(1e3 * config.simDimensions[0] / resolution + 1))
-    coords = np.meshgrid(coordinateAxis, coordinateAxis, coordinateAxis)
-
-    mask = np.zeros(np.shape(coords[0]))
-    mask[np.square(coords[0]) + np.square(coords[1]) + np.square(coords[2]) <= (DSV / 2) ** 2] = 1
 
-    octantMask = np.copy(mask)
-    octantMask[coords[0] < 0] = 0
-    octantMask[coords[1] < 0] = 0
-    octantMask[coords[2] < 0] = 0
+    # Squared distance to the centre, broadcast from the 1D axis instead of full coordinate grids
+    axisSquared = np.square(coordinateAxis)
+    r2 = axisSquared[:, None, None] + axisSquared[None, :, None] + axisSquared[None, None, :]
+    mask = r2 <= (DSV / 2) ** 2
 
+    # The axis is sorted, so the negative coordinates are a leading slice along every dimension
+    numNegative = np.count_nonzero(coordinateAxis < 0)
+    octantMask = mask.copy()
+    octantMask[:numNegative] = False
+    octantMask[:, :numNegative] = False
+    octantMask[:, :, :numNegative] = False
 
     return mask, octantMask
 
@@ -118,57 +134,115 @@ def extract_symmetric_ring_positions(ringPositions):
     """
     return ringPositions[ringPositions >= 0]
 
+# Read-only inputs of compute_shim_fields, handed to each pool worker once by _init_shim_worker
+_shim_worker_data = None
+
+def _init_shim_worker(band_number, magnet_nr, band_radius, mask_idx, magnetSize, resolution, simDimensions):
+    global _shim_worker_data
+    _shim_worker_data = (band_number, magnet_nr, band_radius, mask_idx, magnetSize, resolution, simDimensions)
+
+def _compute_shim_field(task):
+    # Field of one ring size at one symmetric position, restricted to the octant points
+    positionIdx, position, sizeIdx = task
+    band_number, magnet_nr, band_radius, mask_idx, magnetSize, resolution, simDimensions = _shim_worker_data
+
+    if position == 0:
+        rings = (0,)
+    else:
+        rings = (-position, position)
+
+    fieldData = None
+    for band_idx in range(band_number[sizeIdx]):
+        band_field_data = halbachFields.createHalbach(
+            numMagnets=int(magnet_nr[sizeIdx][band_idx]),
+            rings=rings,
+            radius=band_radius[sizeIdx][band_idx],
+            magnetSize=magnetSize,
+            resolution=1e3 / resolution,
+            simDimensions=simDimensions
+        )
+        # createHalbach returns a fresh array, so the first band is used as the accumulator
+        if fieldData is None:
+            fieldData = band_field_data
+        else:
+            fieldData += band_field_data
+
+    return positionIdx, sizeIdx, fieldData.reshape(-1, 3)[mask_idx, 0].astype(np.float32, copy=False)
+
 def compute_shim_fields(df, ringPositionsSymmetry, octantMask, simDimensions, magnetSize, resolution):
     """
     Computes the shim fields for each ring position and size.
 
+    Every (position, size) pair is independent, so the fields are computed in a process pool.
+
     Parameters:
     - df (DataFrame): DataFrame containing Halbach ring configurations.
     - ringPositionsSymmetry (numpy.ndarray): Array of non-negative ring positions.
-    - octantMask (numpy.ndarray): Binary mask for the simulation domain.
+    - octantMask (numpy.ndarray): Boolean mask for the simulation domain.
     - simDimensions (tuple): The dimensions of the simulation space.
     - magnetSize (float): The size of each magnet.
     - resolution (float): The resolution of the simulation grid.
 
     Returns:
-    - shimFields (numpy.ndarray): 3D array storing the shim fields for each configuration.
+    - shimFields (numpy.ndarray): 3D array storing the shim fields for each configuration, shaped
+      (positions, sizes, points) so that the field of one shim is a contiguous vector. Stored as float32,
+      the precision halbachFields computes the fields in, which halves the memory streamed per evaluation.
     - num_positions (int): The number of symmetric ring positions processed.
     """
-    num_positions = np.size(ringPositionsSymmetry)
+    num_positions = ringPositionsSymmetry.shape[0]
     num_rings = df.shape[0]
-    shimFields = np.zeros((int(np.sum(octantMask)), num_positions, num_rings))
-
-    for positionIdx, position in enumerate(ringPositionsSymmetry):
-        for sizeIdx in range(num_rings):
-            row = df.iloc[sizeIdx]
-            if position == 0:
-                rings = (0,)
-            else:
-                rings = (-position, position)
-
-            fieldData = None
-
-            for band_idx in range(int(row['BandNumber'])):
-                band_field_data = halbachFields.createHalbach(
-                    numMagnets=int(row['MagnetNr'][band_idx]),
-                    rings=rings,
-                    radius=row['BandRadius'][band_idx],
-                    magnetSize=magnetSize,
-                    resolution=1e3 / resolution,
-                    simDimensions=simDimensions
-                )
-                if fieldData is None:
-                    fieldData = np.zeros_like(band_field_data)
-
-                fieldData += band_field_data
-            
-            shimFields[:, positionIdx, sizeIdx] = fieldData[octantMask == 1, 0]
+
+    # Flat indices of the grid points inside the octant, computed once for all shims
+    mask_idx = np.flatnonzero(octantMask)
+    shimFields = np.zeros((num_positions, num_rings, mask_idx.size), dtype=np.float32)
+
+    # Pull the ring columns out of the DataFrame once, row access through iloc is slow
+    band_number = df['BandNumber'].to_numpy(np.int64)
+    magnet_nr = df['MagnetNr'].to_numpy()
+    band_radius = df['BandRadius'].to_numpy()
+
+    tasks = [(positionIdx, position, sizeIdx)
+             for positionIdx, position in enumerate(ringPositionsSymmetry)
+             for sizeIdx in range(num_rings)]
+
+    # Broadcast the read-only ring data to the workers once, then hand out tasks in chunks.
+    # The pool uses the cores this process may run on, under PBS the job's ncpus rather than the whole node.
+    processes = len(os.sched_getaffinity(0))
+    chunksize = max(1, len(tasks) // (4 * processes))
+    with multiprocessing.Pool(processes=processes, initializer=_init_shim_worker,
+                              initargs=(band_number, magnet_nr, band_radius, mask_idx,
+                                        magnetSize, resolution, simDimensions)) as pool:
+        for positionIdx, sizeIdx, field in pool.imap_unordered(_compute_shim_field, tasks, chunksize=chunksize):
+            shimFields[positionIdx, sizeIdx, :] = field
+
+        pool.close()
+        pool.join()
     
     return shimFields, num_positions
 
 def initialize_shared_data(shimFields):
-    shared_data_base = multiprocessing.Array(ctypes.c_double, np.size(shimFields))
-    shared_data = np.ctypeslib.as_array(shared_data_base.get_obj())
-    shared_data = shared_data.reshape(np.size(shimFields, 0), np.size(shimFields, 1), np.size(shimFields, 2))
+    """
+    Copies the shim fields into a POSIX shared memory block so that all worker
+    processes map the same physical pages instead of holding their own copy.
+
+    Parameters:
+    - shimFields (numpy.ndarray): 3D array storing the shim fields for each configuration.
+
+    Returns:
+    - tuple: (numpy array view on the shared memory, SharedMemory handle). The caller owns the handle
+      and must close() and unlink() it on shutdown. Workers attach with attach_shared_data(shm.name, shape, dtype).
+    """
+    shm = shared_memory.SharedMemory(create=True, size=shimFields.nbytes)
+    shared_data = np.ndarray(shimFields.shape, dtype=shimFields.dtype, buffer=shm.buf)
     shared_data[...] = shimFields[...]
-    return shared_data
\ No newline at end of file
+    return shared_data, shm
+
+def attach_shared_data(name, shape, dtype):
+    """
+    Attaches to a shim field block created by initialize_shared_data.
+
+    Returns:
+    - tuple: (numpy array view on the shared memory, SharedMemory handle backing it).
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    return np.ndarray(shape, dtype=dtype, buffer=shm.buf), shm
@@ -3,9 +3,13 @@
 """
 
 import os
+import re
 import time
 import subprocess
 
+# Matches every "resources_used.<name> = <value>" line of qstat -f output
+_QSTAT_RE = re.compile(r'resources_used\.(\w+)\s*=\s*([^\n]+)')
+
 def get_current_job_id():
     """Get the PBS job ID for the current script."""
     return os.environ.get('PBS_JOBID')
@@ -19,7 +23,8 @@ def monitor_pbs_resources(job_id, interval=600, output_file="pbs_resources.csv")
     - interval (int): Time in seconds between recording values
     - output_file (str): Path to save resource usage data
     """
-    with open(output_file, "w") as file:
+    # Line buffered, so each record reaches the file without an explicit flush
+    with open(output_file, "w", buffering=1) as file:
         # Write the header for CSV
         file.write("Timestamp,CPU_Percent,CPU_Time,Memory_KB,NCPUs,Virtual_Memory_KB,Walltime\n")
         
@@ -39,23 +44,23 @@ def monitor_pbs_resources(job_id, interval=600, output_file="pbs_resources.csv")
                         
                     output = result.stdout
                     
-                    # Extract resource values using simple string parsing
-                    cpupercent = output.split('resources_used.cpupercent =')[1].split('\n')[0].strip()
-                    cput = output.split('resources_used.cput =')[1].split('\n')[0].strip()
-                    mem = output.split('resources_used.mem =')[1].split('\n')[0].strip()
-                    ncpus = output.split('resources_used.ncpus =')[1].split('\n')[0].strip()
-                    vmem = output.split('resources_used.vmem =')[1].split('\n')[0].strip()
-                    walltime = output.split('resources_used.walltime =')[1].split('\n')[0].strip()
+                    # Extract all resource values in a single pass
+                    fields = dict(_QSTAT_RE.findall(output))
+                    cpupercent = fields['cpupercent'].strip()
+                    cput = fields['cput'].strip()
+                    mem = fields['mem'].strip()
+                    ncpus = fields['ncpus'].strip()
+                    vmem = fields['vmem'].strip()
+                    walltime = fields['walltime'].strip()
                     
                     # Write values to file
                     file.write(f"{timestamp},{cpupercent},{cput},{mem},"
                              f"{ncpus},{vmem},{walltime}\n")
-                    file.flush()
                     
                 except subprocess.SubprocessError as e:
                     print(f"Error running qstat: {e}")
                     break
-                except IndexError as e:
+                except KeyError as e:
                     print(f"Error parsing qstat output: {e}")
                     break
                     